@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+logger = logging.getLogger("mcp-obsidian")
+
+def _getenv_number(name: str, default: float, cast: type = float) -> Any:
+    """
+    Read a numeric setting, falling back to `default` (with a warning) on bad input.
+    A typo in a tuning knob should never fail the tool call that first reads it.
+    """
+    value = os.getenv(name, '')
+    if not value.strip():
+        return cast(default)
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"Invalid value {value!r} for {name}, using {default}")
+        return cast(default)
+
+class ResultCache():
+    """
+    TTL cache for read-only query results with stale-while-revalidate.
+
+    Entries younger than `ttl` are returned as-is. Entries older than `ttl` but
+    younger than `ttl + stale_ttl` are returned immediately while a single
+    background task refreshes them. Anything older is fetched inline.
+    """
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        # One fetch per key at a time, shared by every caller that misses on it.
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        # Bumped on every invalidation so fetches started before a write
+        # cannot put their (now outdated) result back into the cache.
+        self._generation = 0
+
+    async def get_or_fetch(self, key: Hashable, fetch_fn: Callable[[], Awaitable[Any]]) -> Any:
+        if self.ttl <= 0:
+            return await fetch_fn()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._start_fetch(key, fetch_fn, background=True)
+                return value
+
+        # Shield the shared task so one cancelled caller does not cancel it for the rest.
+        return await asyncio.shield(self._start_fetch(key, fetch_fn, background=False))
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        # Later callers must not join fetches that started before the write.
+        self._inflight.clear()
+
+    async def _fetch(self, key: Hashable, fetch_fn: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generation
+        value = await fetch_fn()
+        if generation == self._generation:
+            if len(self._entries) >= self.max_entries:
+                self._prune()
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def _start_fetch(self, key: Hashable, fetch_fn: Callable[[], Awaitable[Any]], background: bool) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            return task
+
+        task = asyncio.create_task(self._fetch(key, fetch_fn))
+        self._inflight[key] = task
+
+        def on_done(t: asyncio.Task):
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            if t.cancelled():
+                return
+            # Retrieving the exception also keeps asyncio from warning about it
+            # when every caller waiting on an inline fetch has gone away.
+            error = t.exception()
+            if error is not None and background:
+                # Keep serving the stale value; the next miss will fetch inline.
+                logger.warning(f"Background cache refresh failed for {key!r}: {error}")
+
+        task.add_done_callback(on_done)
+        return task
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - (self.ttl + self.stale_ttl)
+        for key in [k for k, (stored_at, _) in self._entries.items() if stored_at < cutoff]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+
+_result_cache: ResultCache | None = None
+
+def get_result_cache() -> ResultCache:
+    """
+    Return the process-wide result cache, creating it on first use.
+    Settings are read lazily so values loaded from a .env file are honoured.
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            ttl=_getenv_number('OBSIDIAN_CACHE_TTL', 10),
+            stale_ttl=_getenv_number('OBSIDIAN_CACHE_STALE_TTL', 60),
+        )
+    return _result_cache
+
+
+class ContentCache():
+    """
+    Byte-budgeted cache of prefetched note contents.
+
+    Entries are consumed by the first read that hits them, so every prefetched
+    note ends up either as a hit or as waste (expired, evicted or invalidated).
+    The ratio between the two is what `stats()` reports.
+
+    The cache also holds the queue of paths waiting to be prefetched. Paths the
+    caller has read recently are kept out of it, since they are already in the
+    caller's context.
+    """
+    def __init__(self, max_bytes: int, ttl: float, top_n: int = 0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Number of files to prefetch per search or read; 0 disables prefetching.
+        self.top_n = top_n
+        self._entries: dict[str, tuple[float, str, int]] = {}
+        # Ordered sets (dicts with None values), most wanted first.
+        self._queue: dict[str, None] = {}
+        self._recent_reads: dict[str, float] = {}
+        self._size = 0
+        self._generation = 0
+        self.prefetched = 0
+        self.hits = 0
+        self.wasted = 0
+        self.failed = 0
+        self.bytes_fetched = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def __contains__(self, filepath: str) -> bool:
+        return filepath in self._entries
+
+    def take(self, filepath: str) -> str | None:
+        """Return the prefetched copy of `filepath`, if any, and record that it has been read."""
+        now = time.monotonic()
+        # Batch reads call take() without ever enqueueing, so prune here too.
+        if len(self._recent_reads) >= 1024:
+            self._prune_recent_reads(now)
+        self._recent_reads[filepath] = now
+        self._queue.pop(filepath, None)
+        entry = self._entries.pop(filepath, None)
+        if entry is None:
+            return None
+        stored_at, content, size = entry
+        self._size -= size
+        if now - stored_at >= self.ttl:
+            self.wasted += 1
+            return None
+        self.hits += 1
+        return content
+
+    def put(self, filepath: str, content: str, generation: int) -> None:
+        size = len(content.encode('utf-8'))
+        self.bytes_fetched += size
+        # A write since the fetch started means the content may be outdated.
+        if generation != self._generation or filepath in self._entries:
+            return
+        # Read while the prefetch was in flight, so nobody needs this copy.
+        if self._read_recently(filepath, time.monotonic()):
+            return
+        if size > self.max_bytes:
+            return
+        self._sweep()
+        while self._size + size > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+        self._entries[filepath] = (time.monotonic(), content, size)
+        self._size += size
+        self.prefetched += 1
+
+    def enqueue(self, filepaths: list[str], limit: int) -> None:
+        """
+        Put `filepaths` at the front of the prefetch queue, keeping at most `limit`
+        paths. Older requests are dropped first, since they are the least likely
+        to be read next.
+        """
+        now = time.monotonic()
+        self._prune_recent_reads(now)
+        wanted = [
+            p for p in dict.fromkeys(filepaths)
+            if p and p not in self._entries and not self._read_recently(p, now)
+        ]
+        self._queue = dict.fromkeys(list(dict.fromkeys([*wanted, *self._queue]))[:limit])
+
+    def next_queued(self) -> str | None:
+        if not self._queue:
+            return None
+        filepath = next(iter(self._queue))
+        del self._queue[filepath]
+        return filepath
+
+    def has_queued(self) -> bool:
+        return bool(self._queue)
+
+    def record_failure(self) -> None:
+        self.failed += 1
+
+    def invalidate(self, filepath: str) -> None:
+        self._generation += 1
+        prefix = filepath.rstrip('/') + '/'
+        for key in [k for k in self._entries if k == filepath or k.startswith(prefix)]:
+            self._discard(key)
+
+    def stats(self) -> dict:
+        self._sweep()
+        return {
+            'prefetched': self.prefetched,
+            'hits': self.hits,
+            'wasted': self.wasted,
+            'failed': self.failed,
+            'bytes_fetched': self.bytes_fetched,
+            'pending': len(self._entries),
+            'queued': len(self._queue),
+            'cached_bytes': self._size,
+            'hit_ratio': self.hits / self.prefetched if self.prefetched else 0.0,
+        }
+
+    def _prune_recent_reads(self, now: float) -> None:
+        self._recent_reads = {k: t for k, t in self._recent_reads.items() if now - t < self.ttl}
+
+    def _read_recently(self, filepath: str, now: float) -> bool:
+        read_at = self._recent_reads.get(filepath)
+        return read_at is not None and now - read_at < self.ttl
+
+    def _sweep(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, (stored_at, _, _) in self._entries.items() if stored_at <= cutoff]:
+            self._discard(key)
+
+    def _discard(self, filepath: str) -> None:
+        _, _, size = self._entries.pop(filepath)
+        self._size -= size
+        self.wasted += 1
+
+
+_content_cache: ContentCache | None = None
+
+def get_content_cache() -> ContentCache:
+    """
+    Return the process-wide content cache used by the prefetcher, creating it
+    (and parsing the prefetch settings) on first use.
+    """
+    global _content_cache
+    if _content_cache is None:
+        _content_cache = ContentCache(
+            max_bytes=_getenv_number('OBSIDIAN_PREFETCH_MAX_BYTES', 5000000, int),
+            ttl=_getenv_number('OBSIDIAN_PREFETCH_TTL', 10),
+            top_n=_getenv_number('OBSIDIAN_PREFETCH_TOP_N', 0, int),
+        )
+    return _content_cache
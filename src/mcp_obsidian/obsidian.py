@@ -3,6 +3,8 @@ import urllib.parse
 import os
 from typing import Any
 
+from .cache import get_content_cache, get_result_cache
+
 class Obsidian():
     def __init__(
             self, 
@@ -44,6 +46,10 @@ class Obsidian():
         except httpx.RequestError as e:
             raise Exception(f"Request failed: {str(e)}")
 
+    def _invalidate_caches(self, filepath: str) -> None:
+        get_result_cache().invalidate()
+        get_content_cache().invalidate(filepath)
+
     async def list_files_in_vault(self) -> Any:
         url = f"{self.get_base_url()}/vault/"
         
@@ -67,6 +73,13 @@ class Obsidian():
         return await self._safe_call(call_fn)
 
     async def get_file_contents(self, filepath: str) -> Any:
+        content_cache = get_content_cache()
+        # With prefetching off (the default) reads go straight to Obsidian.
+        if content_cache.top_n > 0:
+            prefetched = content_cache.take(filepath)
+            if prefetched is not None:
+                return prefetched
+
         url = f"{self.get_base_url()}/vault/{filepath}"
     
         async def call_fn():
@@ -76,6 +89,25 @@ class Obsidian():
                 return response.text
 
         return await self._safe_call(call_fn)
+
+    async def prefetch_file_contents(self) -> None:
+        """
+        Drain the content cache's prefetch queue one file at a time over a single
+        connection. Paths queued while this runs are picked up too. Failures are
+        only counted since nobody is waiting on the result.
+        """
+        content_cache = get_content_cache()
+
+        async with httpx.AsyncClient(verify=self.verify_ssl, timeout=self.timeout) as client:
+            while (filepath := content_cache.next_queued()) is not None:
+                generation = content_cache.generation
+                try:
+                    response = await client.get(f"{self.get_base_url()}/vault/{filepath}", headers=self._get_headers())
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    content_cache.record_failure()
+                    continue
+                content_cache.put(filepath, response.text, generation)
     
     async def get_batch_file_contents(self, filepaths: list[str]) -> str:
         result = []
@@ -117,7 +149,12 @@ class Obsidian():
                 response.raise_for_status()
                 return None
 
-        return await self._safe_call(call_fn)
+        try:
+            await self._safe_call(call_fn)
+        finally:
+            # The write may have landed even if the response never reached us.
+            self._invalidate_caches(filepath)
+        return None
     
     async def patch_content(self, filepath: str, operation: str, target_type: str, target: str, content: str) -> Any:
         url = f"{self.get_base_url()}/vault/{filepath}"
@@ -135,7 +172,12 @@ class Obsidian():
                 response.raise_for_status()
                 return None
 
-        return await self._safe_call(call_fn)
+        try:
+            await self._safe_call(call_fn)
+        finally:
+            # The write may have landed even if the response never reached us.
+            self._invalidate_caches(filepath)
+        return None
 
     async def put_content(self, filepath: str, content: str) -> Any:
         url = f"{self.get_base_url()}/vault/{filepath}"
@@ -150,7 +192,12 @@ class Obsidian():
                 response.raise_for_status()
                 return None
 
-        return await self._safe_call(call_fn)
+        try:
+            await self._safe_call(call_fn)
+        finally:
+            # The write may have landed even if the response never reached us.
+            self._invalidate_caches(filepath)
+        return None
     
     async def delete_file(self, filepath: str) -> Any:
         url = f"{self.get_base_url()}/vault/{filepath}"
@@ -161,7 +208,12 @@ class Obsidian():
                 response.raise_for_status()
                 return None
             
-        return await self._safe_call(call_fn)
+        try:
+            await self._safe_call(call_fn)
+        finally:
+            # The write may have landed even if the response never reached us.
+            self._invalidate_caches(filepath)
+        return None
     
     async def search_json(self, query: dict) -> Any:
         url = f"{self.get_base_url()}/search/"
@@ -180,6 +232,7 @@ class Obsidian():
     
     async def get_periodic_note(self, period: str, type: str = "content") -> Any:
         url = f"{self.get_base_url()}/periodic/{period}/"
+        cache_key = (self.get_base_url(), 'periodic', period, type)
         
         async def call_fn():
             headers = self._get_headers()
@@ -191,7 +244,7 @@ class Obsidian():
                 response.raise_for_status()
                 return response.text
 
-        return await self._safe_call(call_fn)
+        return await get_result_cache().get_or_fetch(cache_key, lambda: self._safe_call(call_fn))
     
     async def get_recent_periodic_notes(self, period: str, limit: int = 5, include_content: bool = False) -> Any:
         url = f"{self.get_base_url()}/periodic/{period}/recent"
@@ -199,6 +252,7 @@ class Obsidian():
             "limit": limit,
             "includeContent": include_content
         }
+        cache_key = (self.get_base_url(), 'periodic-recent', period, int(limit), bool(include_content))
         
         async def call_fn():
             async with httpx.AsyncClient(verify=self.verify_ssl, timeout=self.timeout) as client:
@@ -206,7 +260,7 @@ class Obsidian():
                 response.raise_for_status()
                 return response.json()
 
-        return await self._safe_call(call_fn)
+        return await get_result_cache().get_or_fetch(cache_key, lambda: self._safe_call(call_fn))
     
     async def get_recent_changes(self, limit: int = 10, days: int = 90) -> Any:
         query_lines = [
@@ -216,6 +270,8 @@ class Obsidian():
             f"LIMIT {limit}"
         ]
         dql_query = "\n".join(query_lines)
+        # Whitespace in DQL is insignificant, so normalise it for the cache key.
+        cache_key = (self.get_base_url(), 'dql', " ".join(dql_query.split()))
         
         url = f"{self.get_base_url()}/search/"
         headers = self._get_headers() | {
@@ -232,4 +288,4 @@ class Obsidian():
                 response.raise_for_status()
                 return response.json()
 
-        return await self._safe_call(call_fn)
\ No newline at end of file
+        return await get_result_cache().get_or_fetch(cache_key, lambda: self._safe_call(call_fn))
\ No newline at end of file
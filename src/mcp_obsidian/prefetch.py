@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import posixpath
+import re
+import urllib.parse
+
+from . import obsidian
+from .cache import get_content_cache
+
+logger = logging.getLogger("mcp-obsidian")
+
+# [[target]], [[target#heading]], [[target|alias]] and ![[embed]]
+WIKILINK_RE = re.compile(r'!?\[\[([^\]|#^]+)[^\]]*\]\]')
+# [text](path.md "title") and [text](<path with spaces.md>)
+MARKDOWN_LINK_RE = re.compile(r'\[[^\]]*\]\((?:<([^>\n]+)>|([^)\s]+))(?:\s+"[^"]*")?\)')
+
+# Files Obsidian embeds rather than opens as notes. Any other suffix is part of
+# the note name (e.g. [[2024.01.15]]), so '.md' is still appended.
+ATTACHMENT_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.svg', '.webp', '.avif',
+    '.mp3', '.wav', '.m4a', '.ogg', '.3gp', '.flac',
+    '.mp4', '.webm', '.ogv', '.mov', '.mkv',
+    '.pdf', '.canvas',
+}
+
+# The single task draining the prefetch queue. Holding the reference also keeps
+# it from being garbage collected mid-flight.
+_worker: asyncio.Task | None = None
+
+def get_top_n() -> int:
+    """Number of files to prefetch per search or read. 0 (the default) disables prefetching."""
+    return get_content_cache().top_n
+
+def _resolve_link(target: str, note_dir: str, vault_relative: bool) -> str | None:
+    target = urllib.parse.unquote(target.split('#', 1)[0]).strip()
+    if not target:
+        return None
+    if target.startswith('/'):
+        path = target.lstrip('/')
+    elif vault_relative:
+        path = target
+    else:
+        path = posixpath.join(note_dir, target)
+    path = posixpath.normpath(path)
+    if path.startswith('..'):
+        return None
+
+    extension = posixpath.splitext(path)[1].lower()
+    if extension == '.md':
+        return path
+    # Only notes are worth prefetching; skip embedded images and attachments.
+    if extension in ATTACHMENT_EXTENSIONS:
+        return None
+    return path + '.md'
+
+def extract_links(filepath: str, content: str) -> list[str]:
+    """
+    Return the vault paths of notes linked from `content`, in order of appearance.
+
+    Obsidian resolves bare names like [[Note]] or [x](Note.md) against the whole
+    vault (its default "shortest path when possible" link format). Without a
+    vault index there is no way to know which folder they live in, so they are
+    skipped. Wikilinks that contain a path are taken as vault-relative, and
+    markdown links that contain one as relative to the note (the "relative
+    path" link format), unless they start with '/'.
+    """
+    note_dir = posixpath.dirname(filepath)
+    links = []
+
+    for match in WIKILINK_RE.finditer(content):
+        target = match.group(1).strip()
+        if '/' not in target:
+            continue
+        links.append((match.start(), _resolve_link(target, note_dir, vault_relative=True)))
+    for match in MARKDOWN_LINK_RE.finditer(content):
+        target = match.group(1) or match.group(2)
+        if '://' in target or target.startswith(('#', 'mailto:')) or '/' not in target:
+            continue
+        links.append((match.start(), _resolve_link(target, note_dir, vault_relative=False)))
+
+    return [path for _, path in sorted(links) if path is not None and path != filepath]
+
+def schedule(api: obsidian.Obsidian, filepaths: list[str]) -> None:
+    """
+    Queue the first N distinct `filepaths` for prefetching if it is enabled.
+
+    New paths go ahead of older ones and the queue never holds more than N,
+    so a burst of reads replaces stale work instead of piling it up. One
+    worker drains the queue over one connection.
+    """
+    global _worker
+
+    top_n = get_top_n()
+    if top_n <= 0:
+        return
+
+    content_cache = get_content_cache()
+    content_cache.enqueue(list(dict.fromkeys(p for p in filepaths if p))[:top_n], top_n)
+    if not content_cache.has_queued() or (_worker is not None and not _worker.done()):
+        return
+
+    async def run():
+        # Let the response that triggered the prefetch go out first.
+        await asyncio.sleep(0)
+        # Paths queued while the connection was closing would otherwise be stranded.
+        while content_cache.has_queued():
+            await api.prefetch_file_contents()
+
+    def on_done(t: asyncio.Task):
+        if not t.cancelled() and t.exception() is not None:
+            logger.warning(f"Prefetch failed: {t.exception()}")
+
+    _worker = asyncio.create_task(run())
+    _worker.add_done_callback(on_done)
+
+def after_search(api: obsidian.Obsidian, results: list) -> None:
+    schedule(api, [result.get('filename', '') for result in results if isinstance(result, dict)])
+
+def after_read(api: obsidian.Obsidian, filepath: str, content: str) -> None:
+    if get_top_n() <= 0:
+        return
+    schedule(api, extract_links(filepath, content))
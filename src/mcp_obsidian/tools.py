@@ -7,7 +7,8 @@ from mcp.types import (
 )
 import json
 import os
-from . import obsidian
+from . import obsidian, prefetch
+from .cache import get_content_cache
 
 # This function will be called by server.py to register all tools
 def register_tools(app: FastMCP):
@@ -51,6 +52,7 @@ def register_tools(app: FastMCP):
         """
         api = get_api_client()
         content = await api.get_file_contents(filepath)
+        prefetch.after_read(api, filepath, content)
         return json.dumps(content, indent=2)
 
     @app.tool()
@@ -64,6 +66,7 @@ def register_tools(app: FastMCP):
         """
         api = get_api_client()
         results = await api.search(query, context_length)
+        prefetch.after_search(api, results)
         # Formatting logic remains the same as before
         formatted_results = []
         for result in results:
@@ -149,6 +152,7 @@ def register_tools(app: FastMCP):
         """
         api = get_api_client()
         results = await api.search_json(query)
+        prefetch.after_search(api, results)
         return json.dumps(results, indent=2)
 
     @app.tool()
@@ -203,4 +207,13 @@ def register_tools(app: FastMCP):
         """
         api = get_api_client()
         results = await api.get_recent_changes(limit, days)
-        return json.dumps(results, indent=2)
\ No newline at end of file
+        return json.dumps(results, indent=2)
+
+    @app.tool()
+    async def obsidian_get_prefetch_stats() -> str:
+        """
+        Return prefetch counters: notes prefetched, prefetched notes that were later read (hits),
+        notes dropped unread (wasted), prefetches that failed (e.g. missing notes), bytes fetched,
+        and the resulting hit ratio.
+        """
+        return json.dumps(get_content_cache().stats(), indent=2)
\ No newline at end of file
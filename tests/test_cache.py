@@ -0,0 +1,249 @@
+import asyncio
+import time
+
+import pytest
+
+from mcp_obsidian.cache import ContentCache, ResultCache
+
+
+class Counter():
+    """Fetch function that returns how many times it has been called."""
+    def __init__(self, delay: float = 0.01):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.calls
+
+
+def test_result_cache_serves_fresh_entries():
+    async def run():
+        cache = ResultCache(ttl=60, stale_ttl=60)
+        fetch = Counter()
+        assert await cache.get_or_fetch('k', fetch) == 1
+        assert await cache.get_or_fetch('k', fetch) == 1
+        assert fetch.calls == 1
+
+    asyncio.run(run())
+
+
+def test_result_cache_disabled_when_ttl_is_zero():
+    async def run():
+        cache = ResultCache(ttl=0, stale_ttl=60)
+        fetch = Counter()
+        await cache.get_or_fetch('k', fetch)
+        await cache.get_or_fetch('k', fetch)
+        assert fetch.calls == 2
+
+    asyncio.run(run())
+
+
+def test_result_cache_single_flight_on_miss():
+    async def run():
+        cache = ResultCache(ttl=60, stale_ttl=60)
+        fetch = Counter()
+        results = await asyncio.gather(*(cache.get_or_fetch('k', fetch) for _ in range(5)))
+        assert results == [1] * 5
+        assert fetch.calls == 1
+
+    asyncio.run(run())
+
+
+def test_result_cache_stale_while_revalidate():
+    async def run():
+        cache = ResultCache(ttl=0.05, stale_ttl=60)
+        fetch = Counter()
+        await cache.get_or_fetch('k', fetch)
+        await asyncio.sleep(0.06)
+
+        # Stale: the old value comes back at once and one refresh starts.
+        assert await cache.get_or_fetch('k', fetch) == 1
+        assert await cache.get_or_fetch('k', fetch) == 1
+        await asyncio.sleep(0.03)
+        assert fetch.calls == 2
+        assert await cache.get_or_fetch('k', fetch) == 2
+
+    asyncio.run(run())
+
+
+def test_result_cache_expired_entries_are_fetched_inline():
+    async def run():
+        cache = ResultCache(ttl=0.02, stale_ttl=0.02)
+        fetch = Counter()
+        await cache.get_or_fetch('k', fetch)
+        await asyncio.sleep(0.05)
+        assert await cache.get_or_fetch('k', fetch) == 2
+
+    asyncio.run(run())
+
+
+def test_result_cache_failed_refresh_keeps_stale_value():
+    async def run():
+        cache = ResultCache(ttl=0.02, stale_ttl=60)
+        await cache.get_or_fetch('k', Counter())
+        await asyncio.sleep(0.03)
+
+        async def failing():
+            raise Exception("boom")
+
+        assert await cache.get_or_fetch('k', failing) == 1
+        await asyncio.sleep(0.01)
+        assert await cache.get_or_fetch('k', failing) == 1
+
+    asyncio.run(run())
+
+
+def test_result_cache_invalidate_discards_pre_write_fetches():
+    async def run():
+        cache = ResultCache(ttl=60, stale_ttl=60)
+        slow = Counter(delay=0.05)
+        pending = asyncio.create_task(cache.get_or_fetch('k', slow))
+        await asyncio.sleep(0.01)
+
+        cache.invalidate()
+        # The caller still gets its answer, but it must not be cached.
+        assert await pending == 1
+
+        fetch = Counter()
+        assert await cache.get_or_fetch('k', fetch) == 1
+        assert fetch.calls == 1
+
+    asyncio.run(run())
+
+
+def test_result_cache_fetch_errors_are_not_cached():
+    async def run():
+        cache = ResultCache(ttl=60, stale_ttl=60)
+
+        async def failing():
+            raise Exception("boom")
+
+        for _ in range(2):
+            with pytest.raises(Exception, match="boom"):
+                await cache.get_or_fetch('k', failing)
+
+        assert await cache.get_or_fetch('k', Counter()) == 1
+
+    asyncio.run(run())
+
+
+def test_content_cache_counts_hits_and_waste():
+    cache = ContentCache(max_bytes=100, ttl=60)
+    cache.put('a.md', 'aaa', cache.generation)
+    cache.put('b.md', 'bbb', cache.generation)
+
+    assert cache.take('a.md') == 'aaa'
+    # Entries are consumed by the first read.
+    assert cache.take('a.md') is None
+    cache.invalidate('b.md')
+
+    stats = cache.stats()
+    assert stats['prefetched'] == 2
+    assert stats['hits'] == 1
+    assert stats['wasted'] == 1
+    assert stats['hit_ratio'] == 0.5
+
+
+def test_content_cache_counts_failures_and_bytes():
+    cache = ContentCache(max_bytes=100, ttl=60)
+    cache.record_failure()
+    cache.put('a.md', 'é', cache.generation)
+
+    stats = cache.stats()
+    assert stats['failed'] == 1
+    assert stats['bytes_fetched'] == 2
+    assert stats['cached_bytes'] == 2
+
+
+def test_content_cache_evicts_oldest_to_stay_in_budget():
+    cache = ContentCache(max_bytes=10, ttl=60)
+    cache.put('a.md', '12345', cache.generation)
+    cache.put('b.md', '123456', cache.generation)
+    # Larger than the whole budget: never stored.
+    cache.put('c.md', 'x' * 11, cache.generation)
+
+    assert 'a.md' not in cache
+    assert 'b.md' in cache
+    assert cache.stats()['cached_bytes'] == 6
+    assert cache.stats()['wasted'] == 1
+
+
+def test_content_cache_ignores_fetches_started_before_a_write():
+    cache = ContentCache(max_bytes=100, ttl=60)
+    generation = cache.generation
+    cache.invalidate('a.md')
+    cache.put('a.md', 'old', generation)
+    assert 'a.md' not in cache
+
+
+def test_content_cache_invalidates_directories():
+    cache = ContentCache(max_bytes=100, ttl=60)
+    cache.put('dir/a.md', 'a', cache.generation)
+    cache.put('dir/sub/b.md', 'b', cache.generation)
+    cache.put('dir2/c.md', 'c', cache.generation)
+    cache.invalidate('dir/')
+    assert 'dir/a.md' not in cache
+    assert 'dir/sub/b.md' not in cache
+    assert 'dir2/c.md' in cache
+
+
+def test_content_cache_sweeps_expired_entries():
+    cache = ContentCache(max_bytes=10, ttl=0.02)
+    cache.put('a.md', '123456', cache.generation)
+    time.sleep(0.03)
+
+    stats = cache.stats()
+    assert stats['pending'] == 0
+    assert stats['cached_bytes'] == 0
+    assert stats['wasted'] == 1
+
+    # Expired entries no longer use up the budget.
+    cache.put('b.md', '123456', cache.generation)
+    cache.put('c.md', '1234', cache.generation)
+    assert 'b.md' in cache
+    assert 'c.md' in cache
+
+
+def test_content_cache_queue_prefers_newest_and_respects_limit():
+    cache = ContentCache(max_bytes=100, ttl=60)
+    cache.enqueue(['a.md', 'b.md'], limit=3)
+    cache.enqueue(['c.md', 'a.md'], limit=3)
+
+    assert [cache.next_queued() for _ in range(4)] == ['c.md', 'a.md', 'b.md', None]
+
+
+def test_content_cache_queue_skips_cached_and_recently_read():
+    cache = ContentCache(max_bytes=100, ttl=60)
+    cache.put('cached.md', 'x', cache.generation)
+    cache.take('read.md')
+    cache.enqueue(['cached.md', 'read.md', 'new.md'], limit=5)
+
+    assert cache.next_queued() == 'new.md'
+    assert not cache.has_queued()
+
+
+def test_content_cache_foreground_read_drops_queued_and_in_flight_paths():
+    cache = ContentCache(max_bytes=100, ttl=60)
+    cache.enqueue(['a.md', 'b.md'], limit=5)
+
+    # 'a.md' is read while queued, 'b.md' while its prefetch is in flight.
+    cache.take('a.md')
+    assert cache.next_queued() == 'b.md'
+    generation = cache.generation
+    cache.take('b.md')
+    cache.put('b.md', 'b', generation)
+
+    assert not cache.has_queued()
+    assert 'b.md' not in cache
+    assert cache.stats()['prefetched'] == 0
+
+
+def test_content_cache_prunes_old_reads_on_take():
+    cache = ContentCache(max_bytes=100, ttl=0.01)
+    for i in range(1024):
+        cache.take(f'{i}.md')
+    time.sleep(0.02)
+    cache.take('last.md')
+    assert list(cache._recent_reads) == ['last.md']
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from mcp_obsidian import cache, obsidian, prefetch
+from mcp_obsidian.cache import ContentCache
+from mcp_obsidian.prefetch import extract_links
+
+
+def test_extract_links_vault_relative_wikilinks():
+    content = "See [[projects/alpha]], [[projects/beta#Goals|the goals]] and ![[notes/embedded]]."
+    assert extract_links('daily/today.md', content) == [
+        'projects/alpha.md',
+        'projects/beta.md',
+        'notes/embedded.md',
+    ]
+
+
+def test_extract_links_skips_bare_names():
+    # Bare names can live in any folder, so they cannot be resolved without a vault index.
+    content = "[[Other]] [[Other#Heading]] [[Other|alias]] [x](Other.md) [y](<My Note.md>) [z](Other)"
+    assert extract_links('dir/a.md', content) == []
+
+
+def test_extract_links_names_with_dots():
+    content = "[[journal/2024.01.15]] [[notes/v1.2 notes]] [x](./release.v2) [y](<./v3.0 plan>)"
+    assert extract_links('dir/a.md', content) == [
+        'journal/2024.01.15.md',
+        'notes/v1.2 notes.md',
+        'dir/release.v2.md',
+        'dir/v3.0 plan.md',
+    ]
+
+
+def test_extract_links_skips_attachments():
+    content = "![[assets/diagram.png]] [[assets/paper.PDF]] [board](./plan.canvas) [n](./note.md)"
+    assert extract_links('a.md', content) == ['note.md']
+
+
+def test_extract_links_markdown_links():
+    content = (
+        "[up](../shared.md) [space](sub%20dir/z.md \"title\") [angle](<./my note.md>) "
+        "[root](/top.md) [anchor](#section) [web](https://example.com/x.md) [mail](mailto:a@b.c)"
+    )
+    assert extract_links('dir/sub/a.md', content) == [
+        'dir/shared.md',
+        'dir/sub/sub dir/z.md',
+        'dir/sub/my note.md',
+        'top.md',
+    ]
+
+
+def test_extract_links_ignores_self_and_paths_outside_vault():
+    assert extract_links('dir/a.md', "[self](./a.md) [[dir/a]] [out](../../x.md)") == []
+
+
+def test_extract_links_keeps_order_of_appearance():
+    content = "[b](./b.md) [[x/a]] [c](./c.md)"
+    assert extract_links('n.md', content) == ['b.md', 'x/a.md', 'c.md']
+
+
+class FakeApi():
+    """Stands in for Obsidian: drains the prefetch queue and records what it fetched."""
+    def __init__(self, content_cache: ContentCache):
+        self.content_cache = content_cache
+        self.fetched = []
+        self.connections = 0
+
+    async def prefetch_file_contents(self):
+        self.connections += 1
+        while (filepath := self.content_cache.next_queued()) is not None:
+            generation = self.content_cache.generation
+            await asyncio.sleep(0.01)
+            self.fetched.append(filepath)
+            self.content_cache.put(filepath, filepath, generation)
+
+
+@pytest.fixture
+def content_cache(monkeypatch):
+    content_cache = ContentCache(max_bytes=1000, ttl=60, top_n=2)
+    monkeypatch.setattr(cache, '_content_cache', content_cache)
+    monkeypatch.setattr(prefetch, '_worker', None)
+    return content_cache
+
+
+def test_schedule_disabled_when_top_n_is_zero(content_cache):
+    content_cache.top_n = 0
+
+    async def run():
+        prefetch.schedule(FakeApi(content_cache), ['a.md'])
+        assert prefetch._worker is None
+        assert not content_cache.has_queued()
+
+    asyncio.run(run())
+
+
+def test_schedule_coalesces_bursts_into_one_worker(content_cache):
+    async def run():
+        api = FakeApi(content_cache)
+        # A burst of 30 reads must not queue 30 batches.
+        for i in range(30):
+            prefetch.schedule(api, [f'n{i}-a.md', f'n{i}-b.md', f'n{i}-c.md'])
+        await prefetch._worker
+
+        assert api.connections == 1
+        assert api.fetched == ['n29-a.md', 'n29-b.md']
+
+    asyncio.run(run())
+
+
+def test_schedule_picks_up_paths_queued_while_running(content_cache):
+    async def run():
+        api = FakeApi(content_cache)
+        prefetch.schedule(api, ['a.md'])
+        await asyncio.sleep(0.005)
+        prefetch.schedule(api, ['b.md'])
+        await prefetch._worker
+
+        assert api.fetched == ['a.md', 'b.md']
+        assert 'a.md' in content_cache and 'b.md' in content_cache
+
+    asyncio.run(run())
+
+
+
+@pytest.mark.parametrize('value, expected', [(None, 0), ('', 0), ('off', 0), ('3', 3)])
+def test_top_n_setting_never_raises(monkeypatch, value, expected):
+    monkeypatch.setattr(cache, '_content_cache', None)
+    if value is None:
+        monkeypatch.delenv('OBSIDIAN_PREFETCH_TOP_N', raising=False)
+    else:
+        monkeypatch.setenv('OBSIDIAN_PREFETCH_TOP_N', value)
+    assert prefetch.get_top_n() == expected
+
+
+def test_reads_bypass_content_cache_when_prefetch_is_off(content_cache, monkeypatch):
+    async def fresh(self, call_fn):
+        return 'fresh'
+
+    monkeypatch.setattr(obsidian.Obsidian, '_safe_call', fresh)
+    content_cache.top_n = 0
+    content_cache.put('a.md', 'prefetched', content_cache.generation)
+
+    api = obsidian.Obsidian(api_key='key')
+    assert asyncio.run(api.get_file_contents('a.md')) == 'fresh'
+    assert content_cache._recent_reads == {}